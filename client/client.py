@@ -1,43 +1,125 @@
 #!/usr/bin/env python3
 
 import argparse
+import io
+import re
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 import json
 try:
     import readline
 except ImportError:
     readline = None
-import shlex
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from typing import Dict, Any, List
 
+SYMBOL_PATTERN = re.compile(r"[A-Za-z0-9._-]+")
+
+# Depth table layout, formatted once at import time
+DEPTH_HEADER = f"{'Side':<10} {'Price':<10} {'Qty':<10} {'Count':<6}\n"
+DEPTH_SEPARATOR = "-" * 40 + "\n"
+DEPTH_EMPTY = f"{'EMPTY':^40}\n"
+DEPTH_NO_ASKS = f"{'--- no asks ---':^40}\n"
+DEPTH_NO_BIDS = f"{'--- no bids ---':^40}\n"
+# Colour and padded label are baked in here; only price/qty/count are formatted per row
+_ROW = "\033[{color}m{label:<10} {{price:<10}} {{qty:<10}} {{count:<6}}\033[0m\n"
+ASK_ROW = _ROW.format(color=91, label="ASK")
+BID_ROW = _ROW.format(color=92, label="BID")
+
+def _as_int(name: str, value: Any) -> int:
+    # JSON numbers may arrive as integral floats (e.g. 150.0); anything else is rejected
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"Invalid {name}: {value!r}")
+
+def _json_loads(data: bytes) -> Any:
+    # orjson parses the raw bytes directly; stdlib json accepts bytes too
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class EchoMillClient:
+    # Request bodies have a fixed schema, so they are formatted directly instead of going through a JSON encoder.
+    # Fields are validated and coerced to int before formatting; see _order_fields.
+    _ORDER_TMPL = '{{"symbol":"{s}","side":{side:d},"price":{p:d},"qty":{q:d},"id":{oid:d},"type":{t:d}}}'
+    _CANCEL_TMPL = '{{"id":{oid:d}}}'
+
     def __init__(self, host: str, port: int):
         self.base_url = f"http://{host}:{port}"
         self.next_order_id = 1000
+        # Reuse one connection pool for all calls instead of a fresh socket per request
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json", "Connection": "keep-alive"})
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        # Resolve proxy settings for the server once; otherwise requests rescans the environment on every call
+        self.session.proxies = requests.utils.get_environ_proxies(self.base_url)
+        self.session.trust_env = False
+
+    def close(self):
+        self.session.close()
+
+    def _order_fields(self, symbol, side, price, qty, order_id, order_type):
+        """Validate an order's fields, returning them with numbers coerced to int; raises ValueError."""
+        # The symbol is spliced into the JSON template unescaped, so only allow plain tickers
+        if not isinstance(symbol, str) or not SYMBOL_PATTERN.fullmatch(symbol):
+            raise ValueError(f"Invalid symbol: {symbol}")
+        return (symbol, _as_int("side", side), _as_int("price", price), _as_int("qty", qty),
+                None if order_id is None else _as_int("id", order_id), _as_int("type", order_type))
 
     def post_order(self, symbol: str, side: int, price: int, qty: int, order_id: int = None, order_type: int = 1):
+        try:
+            symbol, side, price, qty, order_id, order_type = self._order_fields(
+                symbol, side, price, qty, order_id, order_type)
+        except ValueError as e:
+            print(f"\033[91mERROR: {e}\033[0m")
+            return
+
         if order_id is None:
             order_id = self.next_order_id
             self.next_order_id += 1
             
-        payload = {
-            "symbol": symbol,
-            "side": side,
-            "price": price,
-            "qty": qty,
-            "id": order_id,
-            "type": order_type
-        }
+        body = self._ORDER_TMPL.format(s=symbol, side=side, p=price, q=qty, oid=order_id, t=order_type).encode()
         try:
-            response = requests.post(f"{self.base_url}/orders", json=payload)
+            response = self.session.post(f"{self.base_url}/orders", data=body)
             self._handle_response(response)
         except requests.exceptions.ConnectionError:
             print(f"Error: Could not connect to server at {self.base_url}")
 
+    def post_orders_bulk(self, orders: List[Dict[str, Any]]):
+        # Orders use the wire format of POST /orders; a missing "id" is auto-assigned.
+        # The server answers one request per connection over HTTP/1.1, so orders
+        # are sent back to back through the shared session rather than multiplexed.
+        # Validate the whole batch up front so a bad entry can't leave it half sent
+        prepared = []
+        for order in orders:
+            try:
+                prepared.append(self._order_fields(order["symbol"], order["side"], order["price"], order["qty"],
+                                                   order.get("id"), order.get("type", 1)))
+            except KeyError as e:
+                print(f"\033[91mERROR: Invalid order {order}: missing {e}\033[0m")
+                return
+            except ValueError as e:
+                print(f"\033[91mERROR: Invalid order {order}: {e}\033[0m")
+                return
+        for args in prepared:
+            self.post_order(*args)
+
     def cancel_order(self, order_id: int):
-        payload = {"id": order_id}
         try:
-            response = requests.delete(f"{self.base_url}/orders", json=payload)
+            order_id = _as_int("id", order_id)
+        except ValueError as e:
+            print(f"\033[91mERROR: {e}\033[0m")
+            return
+
+        body = self._CANCEL_TMPL.format(oid=order_id).encode()
+        try:
+            response = self.session.delete(f"{self.base_url}/orders", data=body)
             self._handle_response(response)
         except requests.exceptions.ConnectionError:
             print(f"Error: Could not connect to server at {self.base_url}")
@@ -45,9 +127,9 @@ class EchoMillClient:
     def get_depth(self, symbol: str, levels: int = 5):
         try:
             params = {"symbol": symbol, "levels": levels}
-            response = requests.get(f"{self.base_url}/depth", params=params)
+            response = self.session.get(f"{self.base_url}/depth", params=params)
             if response.status_code == 200:
-                data = response.json()
+                data = _json_loads(response.content)
                 self._print_depth(symbol, data)
             else:
                 self._handle_response(response)
@@ -56,54 +138,57 @@ class EchoMillClient:
 
     def get_status(self):
         try:
-            response = requests.get(f"{self.base_url}/status")
+            response = self.session.get(f"{self.base_url}/status")
             self._handle_response(response)
         except requests.exceptions.ConnectionError:
             print(f"Error: Could not connect to server at {self.base_url}")
 
     def get_trades(self):
         try:
-            response = requests.get(f"{self.base_url}/trades")
+            response = self.session.get(f"{self.base_url}/trades")
             self._handle_response(response)
         except requests.exceptions.ConnectionError:
             print(f"Error: Could not connect to server at {self.base_url}")
 
     def _handle_response(self, response: requests.Response):
         try:
-            data = response.json()
+            data = _json_loads(response.content)
             if "error" in data:
                 print(f"\033[91mERROR: {data['error']}\033[0m")
             else:
+                # Pretty-printing is display only, keep stdlib for its indent layout
                 print(json.dumps(data, indent=2))
         except ValueError:
             print(f"HTTP {response.status_code}: {response.text}")
 
     def _print_depth(self, symbol: str, data: Dict[str, Any]):
-        print(f"\n--- Order Book: {symbol} ---")
-        
         asks = data.get("asks", [])
         bids = data.get("bids", [])
-        
-        print(f"{'Side':<10} {'Price':<10} {'Qty':<10} {'Count':<6}")
-        print("-" * 40)
-        
+
+        # Build the whole table first and emit it with a single write
+        out = io.StringIO()
+        out.write(f"\n--- Order Book: {symbol} ---\n")
+        out.write(DEPTH_HEADER)
+        out.write(DEPTH_SEPARATOR)
+
         # Asks in descending price order (to put best ask at bottom of red section)
         for ask in reversed(asks):
-            print(f"\033[91m{'ASK':<10} {ask['price']:<10} {ask['qty']:<10} {ask.get('count', '-'):<6}\033[0m")
-            
+            out.write(ASK_ROW.format(price=ask['price'], qty=ask['qty'], count=ask.get('count', '-')))
+
         if not asks and not bids:
-            print(f"{'EMPTY':^40}")
+            out.write(DEPTH_EMPTY)
         elif not asks:
-            print(f"{'--- no asks ---':^40}")
-            
-        print("-" * 40)
-        
+            out.write(DEPTH_NO_ASKS)
+
+        out.write(DEPTH_SEPARATOR)
+
         if not bids:
-            print(f"{'--- no bids ---':^40}")
+            out.write(DEPTH_NO_BIDS)
         for bid in bids:
-            print(f"\033[92m{'BID':<10} {bid['price']:<10} {bid['qty']:<10} {bid.get('count', '-'):<6}\033[0m")
-            
-        print("-" * 40)
+            out.write(BID_ROW.format(price=bid['price'], qty=bid['qty'], count=bid.get('count', '-')))
+
+        out.write(DEPTH_SEPARATOR)
+        sys.stdout.write(out.getvalue())
 
 def run_interactive(client: EchoMillClient):
     print("EchoMill Interactive Client")
@@ -115,7 +200,12 @@ def run_interactive(client: EchoMillClient):
             if not line.strip():
                 continue
                 
-            parts = shlex.split(line)
+            # Commands are plain whitespace-separated tokens; only pay for shlex when quotes appear
+            if '"' in line or "'" in line:
+                import shlex
+                parts = shlex.split(line)
+            else:
+                parts = line.split()
             cmd = parts[0].lower()
             
             if cmd == "exit" or cmd == "quit":
@@ -162,51 +252,66 @@ def run_interactive(client: EchoMillClient):
         except Exception as e:
             print(f"Error: {e}")
 
-def main():
-    parser = argparse.ArgumentParser(description="EchoMill CLI Client")
-    parser.add_argument("--host", default="localhost", help="Server host")
-    parser.add_argument("--port", type=int, default=8080, help="Server port")
-    
-    subparsers = parser.add_subparsers(dest="command")
-    
-    # Buy/Sell
-    for cmd in ["buy", "sell"]:
-        p = subparsers.add_parser(cmd)
+COMMANDS = ("buy", "sell", "cancel", "depth", "status", "trades")
+
+def _add_command_parser(subparsers, cmd: str):
+    p = subparsers.add_parser(cmd)
+    if cmd in ["buy", "sell"]:
         p.add_argument("symbol", help="Trading symbol")
         p.add_argument("qty", type=int, help="Quantity")
         p.add_argument("price", type=int, help="Price")
         p.add_argument("--id", type=int, help="Order ID")
         p.add_argument("--market", action="store_true", help="Market order")
+    elif cmd == "cancel":
+        p.add_argument("id", type=int, help="Order ID")
+    elif cmd == "depth":
+        p.add_argument("symbol", help="Trading symbol")
+        p.add_argument("--levels", type=int, default=5, help="Levels")
 
-    # Cancel
-    p = subparsers.add_parser("cancel")
-    p.add_argument("id", type=int, help="Order ID")
+def _peek_command(argv: List[str]):
+    # First positional argument, skipping the values of --host/--port
+    skip_value = False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+        elif arg in ["--host", "--port"]:
+            skip_value = True
+        elif not arg.startswith("-"):
+            return arg if arg in COMMANDS else None
+    return None
 
-    # Depth
-    p = subparsers.add_parser("depth")
-    p.add_argument("symbol", help="Trading symbol")
-    p.add_argument("--levels", type=int, default=5, help="Levels")
+def main():
+    parser = argparse.ArgumentParser(description="EchoMill CLI Client")
+    parser.add_argument("--host", default="localhost", help="Server host")
+    parser.add_argument("--port", type=int, default=8080, help="Server port")
+    
+    subparsers = parser.add_subparsers(dest="command")
 
-    subparsers.add_parser("status")
-    subparsers.add_parser("trades")
+    # Only build the subparser that will be used; fall back to all of them for help/errors
+    command = _peek_command(sys.argv[1:])
+    for cmd in [command] if command is not None else COMMANDS:
+        _add_command_parser(subparsers, cmd)
 
     args = parser.parse_args()
     client = EchoMillClient(args.host, args.port)
 
-    if args.command is None:
-        run_interactive(client)
-    elif args.command in ["buy", "sell"]:
-        side = 1 if args.command == "buy" else -1
-        order_type = 2 if args.market else 1
-        client.post_order(args.symbol, side, args.price, args.qty, args.id, order_type)
-    elif args.command == "cancel":
-        client.cancel_order(args.id)
-    elif args.command == "depth":
-        client.get_depth(args.symbol, args.levels)
-    elif args.command == "status":
-        client.get_status()
-    elif args.command == "trades":
-        client.get_trades()
+    try:
+        if args.command is None:
+            run_interactive(client)
+        elif args.command in ["buy", "sell"]:
+            side = 1 if args.command == "buy" else -1
+            order_type = 2 if args.market else 1
+            client.post_order(args.symbol, side, args.price, args.qty, args.id, order_type)
+        elif args.command == "cancel":
+            client.cancel_order(args.id)
+        elif args.command == "depth":
+            client.get_depth(args.symbol, args.levels)
+        elif args.command == "status":
+            client.get_status()
+        elif args.command == "trades":
+            client.get_trades()
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     main()
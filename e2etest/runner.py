@@ -1,64 +1,159 @@
 #!/usr/bin/env python3
 
+import contextlib
+import http.client
+import io
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 import subprocess
 import time
+import traceback
 import urllib.request
-import urllib.error
 import socket
 from pathlib import Path
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Sentinel for keys absent from the actual response
+_MISSING = object()
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _json_dumps(obj):
+    """Serialize 'obj' to UTF-8 encoded JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def _normalize(value):
+    """Convert numeric strings in an expected tree to numbers so leaves compare without str()."""
+    if type(value) is dict:
+        return {k: _normalize(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_normalize(v) for v in value]
+    if type(value) is str:
+        # Only convert when the number prints back identically (and is not NaN), so matching is unchanged
+        for number_type in (int, float):
+            try:
+                number = number_type(value)
+            except ValueError:
+                continue
+            if str(number) == value and number == number:
+                return number
+    return value
+
+# Parsed scenarios keyed by (path, mtime); entries are treated as read-only
+_SCENARIO_CACHE = {}
+
+def _load_scenario(scenario_path):
+    scenario_path = Path(scenario_path)
+    key = (str(scenario_path), scenario_path.stat().st_mtime)
+    scenario = _SCENARIO_CACHE.get(key)
+    if scenario is None:
+        scenario = _json_loads(scenario_path.read_bytes())
+        for step in scenario['steps']:
+            if 'expect_body' in step:
+                step['expect_body'] = _normalize(step['expect_body'])
+        _SCENARIO_CACHE[key] = scenario
+    return scenario
 
 class E2ETestRunner:
     def __init__(self, server_path, instruments_path):
         self.server_path = server_path
         self.instruments_path = instruments_path
-        self.port = self._find_free_port()
-        self.base_url = f"http://localhost:{self.port}"
+        self.port = None
+        self.base_url = None
+        self.port_reservation = None
         self.server_proc = None
+        self.conn = None
+        # Server output is only streamed when E2E_VERBOSE is set
+        self.verbose = os.environ.get("E2E_VERBOSE", "").strip().lower() not in ("", "0", "false", "no", "off")
+        self.stream_thread = None
 
-    def _find_free_port(self):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind(('', 0))
-            return s.getsockname()[1]
+    def _reserve_port(self):
+        """Bind (without listening) a free port and return the socket holding it.
 
-    def start_server(self):
+        With SO_REUSEADDR on both sides the server can still bind the port, while
+        other ephemeral binds (e.g. parallel scenarios) avoid it until the socket is closed.
+        """
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(('', 0))
+        return s
+
+    def _launch_server(self):
+        """Spawn the server process without waiting for it to become ready."""
         # need a new free port each time we start if we want to be safe
-        self.port = self._find_free_port()
+        self.port_reservation = self._reserve_port()
+        self.port = self.port_reservation.getsockname()[1]
         self.base_url = f"http://localhost:{self.port}"
-        
-        print(f"--- Starting Echomill Server on port {self.port} ---")
-        self.server_proc = subprocess.Popen(
-            [self.server_path, str(self.port), self.instruments_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1 # Line buffered
-        )
-        
-        # Start a thread to stream output
-        import threading
-        def stream_output(pipe):
-            for line in pipe:
-                print(f"  [SERVER] {line.strip()}")
-        
-        self.stream_thread = threading.Thread(target=stream_output, args=(self.server_proc.stdout,))
-        self.stream_thread.daemon = True
-        self.stream_thread.start()
-
-        # Wait for server to be ready
-        retries = 20
-        while retries > 0:
+
+        if not self.verbose:
+            # Discard the server log so the server can never block on a full, unread pipe
+            self.server_proc = subprocess.Popen(
+                [self.server_path, str(self.port), self.instruments_path],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        else:
+            self.server_proc = subprocess.Popen(
+                [self.server_path, str(self.port), self.instruments_path],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1 # Line buffered
+            )
+
+            # Start a thread to stream output
+            import threading
+            def stream_output(pipe):
+                for line in pipe:
+                    print(f"  [SERVER] {line.strip()}")
+
+            self.stream_thread = threading.Thread(target=stream_output, args=(self.server_proc.stdout,))
+            self.stream_thread.daemon = True
+            self.stream_thread.start()
+
+        # One connection object serves every step of the scenario; it connects lazily on first use
+        self.conn = http.client.HTTPConnection('localhost', self.port)
+
+    def _wait_ready(self, deadline=2.0):
+        """Poll until the server answers /status, backing off exponentially."""
+        start = time.monotonic()
+        delay = 0.001
+        while time.monotonic() < start + deadline:
+            # The server exits straight away if it could not bind; don't wait out the deadline
+            if self.server_proc.poll() is not None:
+                return False
+            # A bare TCP connect is much cheaper than an HTTP round-trip while the server is still booting
             try:
-                with urllib.request.urlopen(f"{self.base_url}/status") as response:
-                    if response.getcode() == 200:
-                        return True
-            except:
-                time.sleep(0.1)
-                retries -= 1
+                socket.create_connection(('localhost', self.port), timeout=0.05).close()
+            except OSError:
+                pass
+            else:
+                try:
+                    with urllib.request.urlopen(f"{self.base_url}/status", timeout=0.2) as response:
+                        if response.getcode() == 200:
+                            return True
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
         return False
 
     def stop_server(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+        if self.port_reservation:
+            self.port_reservation.close()
+            self.port_reservation = None
         if self.server_proc:
             self.server_proc.terminate()
             try:
@@ -66,85 +161,103 @@ class E2ETestRunner:
             except subprocess.TimeoutExpired:
                 self.server_proc.kill()
             self.server_proc = None
+        if self.stream_thread:
+            # Let the reader flush the server's shutdown lines while stdout is still this scenario's
+            self.stream_thread.join(timeout=1)
+            self.stream_thread = None
+
+    def _request(self, method, path, data):
+        """Send a request on the shared connection and return (status, raw body)."""
+        headers = {'Content-Type': 'application/json'} if data else {}
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            response = self.conn.getresponse()
+        except http.client.RemoteDisconnected:
+            # The server dropped the idle socket before answering; reopen and retry once
+            self.conn.close()
+            self.conn.request(method, path, body=data, headers=headers)
+            response = self.conn.getresponse()
+        return response.status, response.read()
 
     def _subset_match(self, expected, actual):
-        """Recursively check if 'expected' is a subset of 'actual'."""
-        if isinstance(expected, dict):
-            if not isinstance(actual, dict):
-                return False
-            for k, v in expected.items():
-                if k not in actual or not self._subset_match(v, actual[k]):
+        """Check if 'expected' is a subset of 'actual', walking both trees with an explicit stack."""
+        stack = [(expected, actual)]
+        while stack:
+            e, a = stack.pop()
+            te = type(e)
+            if te is dict:
+                if type(a) is not dict:
                     return False
-            return True
-        elif isinstance(expected, list):
-            if not isinstance(actual, list):
-                return False
-            # For simplicity, it is assumed that lists are ordered correctly or we match element-wise
-            if len(expected) != len(actual):
-                return False
-            for e, a in zip(expected, actual):
-                if not self._subset_match(e, a):
+                for k, v in e.items():
+                    child = a.get(k, _MISSING)
+                    if child is _MISSING:
+                        return False
+                    stack.append((v, child))
+            elif te is list:
+                # For simplicity, it is assumed that lists are ordered correctly or we match element-wise
+                if type(a) is not list or len(e) != len(a):
                     return False
-            return True
-        else:
-            return str(expected) == str(actual)
+                stack.extend(zip(e, a))
+            elif te is type(a):
+                if e != a:
+                    return False
+            elif str(e) != str(a):
+                return False
+        return True
 
     def run_scenario(self, scenario_path):
-        with open(scenario_path, 'r') as f:
-            scenario = json.load(f)
+        # Boot the server for this scenario first so parsing the scenario overlaps its startup
+        self._launch_server()
+        try:
+            scenario = _load_scenario(scenario_path)
+            name = scenario['meta'].get('name', scenario_path.name)
+            print(f"\n> Running Scenario: {name}")
+            print(f"--- Starting Echomill Server on port {self.port} ---")
 
-        name = scenario['meta'].get('name', scenario_path.name)
-        print(f"\n> Running Scenario: {name}")
-        
-        # Start server for this scenario
-        if not self.start_server():
-            print("  FAILED: Could not start server.")
-            return False
+            if not self._wait_ready():
+                print("  FAILED: Could not start server.")
+                return False
 
-        try:
             for step in scenario['steps']:
                 step_name = step.get('name', 'Unnamed step')
                 action = step['action']
                 parts = action.split(' ')
                 method = parts[0]
                 path = parts[1]
-                url = f"{self.base_url}{path}"
                 body = step.get('body')
                 expect_status = step.get('expect_status', 200)
                 expect_body = step.get('expect_body')
 
                 print(f"  Step: {step_name} ({action})")
                 
-                req = urllib.request.Request(url, method=method)
-                if body:
-                    req.add_header('Content-Type', 'application/json')
-                    data = json.dumps(body).encode('utf-8')
-                else:
-                    data = None
+                data = _json_dumps(body) if body else None
 
                 try:
-                    with urllib.request.urlopen(req, data=data) as response:
-                        status = response.getcode()
-                        resp_body = json.loads(response.read().decode('utf-8'))
-                except urllib.error.HTTPError as e:
-                    status = e.code
-                    try:
-                        resp_body = json.loads(e.read().decode('utf-8'))
-                    except:
-                        resp_body = {}
+                    status, raw_body = self._request(method, path, data)
                 except Exception as e:
                     print(f"    FAILED: Request error: {e}")
                     return False
 
+                # The body is always drained for connection reuse, but only decoded when it is inspected
+                resp_body = None
+                if expect_body or status != expect_status:
+                    try:
+                        resp_body = _json_loads(raw_body)
+                    except ValueError as e:
+                        if status < 400:
+                            print(f"    FAILED: Request error: {e}")
+                            return False
+                        resp_body = {}
+
                 if status != expect_status:
                     print(f"    FAILED: Expected status {expect_status}, got {status}")
-                    print(f"    Response: {json.dumps(resp_body)}")
+                    print(f"    Response: {_json_dumps(resp_body).decode()}")
                     return False
 
                 if expect_body and not self._subset_match(expect_body, resp_body):
                     print(f"    FAILED: Body mismatch.")
-                    print(f"      Expected (subset): {json.dumps(expect_body)}")
-                    print(f"      Actual: {json.dumps(resp_body)}")
+                    print(f"      Expected (subset): {_json_dumps(expect_body).decode()}")
+                    print(f"      Actual: {_json_dumps(resp_body).decode()}")
                     return False
         finally:
             self.stop_server()
@@ -152,6 +265,22 @@ class E2ETestRunner:
         print(f"  PASSED: {name}")
         return True
 
+def _run_one(server_path, instruments_path, scenario_path):
+    """Run a single scenario with its own runner (and server) in a worker process.
+
+    The scenario's output is captured and returned so it can be printed as one block.
+    """
+    runner = E2ETestRunner(server_path, instruments_path)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            ok = runner.run_scenario(scenario_path)
+        except Exception:
+            # Keep whatever the scenario printed before it crashed
+            print(f"  FAILED: Scenario crashed:\n{traceback.format_exc()}", end='')
+            ok = False
+    return scenario_path.name, ok, log.getvalue()
+
 def main():
     root = Path(__file__).parent.parent
     server_bin = root / "echomill/build/src/echomill_server"
@@ -162,24 +291,35 @@ def main():
         print(f"Error: Server binary not found at {server_bin}")
         exit(1)
 
-    runner = E2ETestRunner(str(server_bin), str(config))
-    
     scenarios = sorted(scenarios_dir.glob("*.json"))
     if not scenarios:
         print("No scenarios found.")
         return
 
-    success = True
-    for s in scenarios:
-        if not runner.run_scenario(s):
-            success = False
-            break
+    # Every scenario gets its own server on its own port, so they can run side by side
+    failed = []
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [(s.name, executor.submit(_run_one, str(server_bin), str(config), s)) for s in scenarios]
+        # Report in file order so logs read the same on every run
+        for name, future in futures:
+            try:
+                name, ok, log = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. the process was killed), so there is no log to show
+                print(f"\n> Scenario {name} crashed: {e!r}")
+                failed.append(name)
+                continue
+            print(log, end='')
+            if not ok:
+                failed.append(name)
 
-    if success:
+    if not failed:
         print("\nALL SCENARIOS PASSED!")
         exit(0)
     else:
-        print("\nSCENARIO FAILED.")
+        print(f"\n{len(failed)} SCENARIO(S) FAILED:")
+        for name in sorted(failed):
+            print(f"  {name}")
         exit(1)
 
 if __name__ == "__main__":